@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# ZEX Tunnel V3 — NIC queue / IRQ / RPS affinity advisor for Waterwall workers
+#
+# Reads /proc and /sys only (nothing is changed) and prints a per-core picture
+# plus a recommended `misc.workers`, IRQ affinity and RPS/XPS plan.
+#
+#   python3 affinity.py                      # live host, 1s sample
+#   python3 affinity.py --json
+#   python3 affinity.py --root tests/fixtures/affinity --interval 0   # any tree laid out like /
+
+import argparse, json, os, re, time
+from pathlib import Path
+
+# ─── Settings ────────────────────────────────────────────────────────────────
+BASE_DIR    = Path(__file__).resolve().parent
+TUN_IFACE   = "wtun0"        # Waterwall's TUN device
+SATURATED   = 85.0           # busy % at which a core counts as saturated
+SOFTIRQ_HOT = 25.0           # softirq % that marks a core as a packet-processing core
+RFS_ENTRIES = 32768          # suggested net.core.rps_sock_flow_entries
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _read(root: Path, rel: str) -> str:
+    try:
+        return (root / rel).read_text(errors="ignore")
+    except Exception:
+        return ""
+
+# ─── CPU masks ───────────────────────────────────────────────────────────────
+def parse_mask(text: str) -> list:
+    """'00000000,0000000f' -> [0, 1, 2, 3]"""
+    digits = text.strip().replace(",", "")
+    value = int(digits, 16) if digits else 0
+    return [i for i in range(value.bit_length()) if value >> i & 1]
+
+def format_mask(cpus) -> str:
+    """[0, 1, 2, 3] -> 'f' (32-bit groups joined by ',' as sysfs expects)"""
+    value = 0
+    for c in cpus: value |= 1 << c
+    text = f"{value:x}"
+    groups = []
+    while text:
+        groups.insert(0, text[-8:]); text = text[:-8]
+    return ",".join(groups) or "0"
+
+def parse_list(text: str) -> list:
+    """'0-2,5' -> [0, 1, 2, 5]"""
+    out = []
+    for part in text.strip().split(","):
+        if not part: continue
+        a, _, b = part.partition("-")
+        out += range(int(a), int(b or a) + 1)
+    return out
+
+def format_list(cpus) -> str:
+    cpus, out = sorted(set(cpus)), []
+    for c in cpus:
+        if out and out[-1][1] == c - 1: out[-1][1] = c
+        else: out.append([c, c])
+    return ",".join(f"{a}" if a == b else f"{a}-{b}" for a, b in out)
+
+# ─── /proc/stat ──────────────────────────────────────────────────────────────
+def cpu_times(root: Path) -> dict:
+    """cpuN -> (user, nice, system, idle, iowait, irq, softirq, steal)"""
+    out = {}
+    for ln in _read(root, "proc/stat").splitlines():
+        m = re.match(r"cpu(\d+)\s+(.*)", ln)
+        if m:
+            vals = [int(x) for x in m.group(2).split()] + [0] * 8
+            out[int(m.group(1))] = tuple(vals[:8])
+    return out
+
+def cpu_usage(root: Path, interval: float = 1.0) -> dict:
+    """Per-core busy / softirq / irq %, over `interval` (or since boot if 0 or idle)."""
+    a = cpu_times(root)
+    b = a
+    if interval > 0:
+        time.sleep(interval)
+        b = cpu_times(root)
+    out = {}
+    for cpu, t1 in b.items():
+        t0 = a.get(cpu, (0,) * 8)
+        d = [x - y for x, y in zip(t1, t0)]
+        if sum(d) <= 0: d = list(t1)          # no movement (e.g. a fixture tree)
+        total = max(sum(d), 1)
+        out[cpu] = {
+            "busy": round(100.0 * (total - d[3] - d[4]) / total, 1),
+            "softirq": round(100.0 * d[6] / total, 1),
+            "irq": round(100.0 * d[5] / total, 1),
+            "steal": round(100.0 * d[7] / total, 1),
+        }
+    return out
+
+# ─── /proc/interrupts ────────────────────────────────────────────────────────
+def parse_interrupts(text: str) -> dict:
+    """irq -> {"counts": [per cpu], "label": str} (numeric IRQs only)"""
+    lines = text.splitlines()
+    if not lines: return {}
+    ncpu = len(lines[0].split())
+    out = {}
+    for ln in lines[1:]:
+        head, _, rest = ln.partition(":")
+        if not head.strip().isdigit(): continue
+        parts = rest.split()
+        counts = [int(x) for x in parts[:ncpu] if x.isdigit()]
+        out[int(head)] = {"counts": counts, "label": " ".join(parts[len(counts):])}
+    return out
+
+# ─── Interfaces ──────────────────────────────────────────────────────────────
+def default_iface(root: Path):
+    best = None
+    for ln in _read(root, "proc/net/route").splitlines()[1:]:
+        f = ln.split()
+        if len(f) >= 7 and f[1] == "00000000":
+            metric = int(f[6]) if f[6].isdigit() else 0
+            if best is None or metric < best[1]: best = (f[0], metric)
+    return best[0] if best else None
+
+def iface_queues(root: Path, iface: str) -> dict:
+    qdir = root / "sys/class/net" / iface / "queues"
+    rx, tx = [], []
+    for q in sorted(qdir.glob("rx-*"), key=lambda p: int(p.name[3:])):
+        rx.append({"queue": q.name, "rps_cpus": parse_mask(_read(q, "rps_cpus")),
+                   "rps_flow_cnt": int(_read(q, "rps_flow_cnt").strip() or 0)})
+    for q in sorted(qdir.glob("tx-*"), key=lambda p: int(p.name[3:])):
+        tx.append({"queue": q.name, "xps_cpus": parse_mask(_read(q, "xps_cpus"))})
+    return {"rx": rx, "tx": tx}
+
+def iface_irqs(root: Path, iface: str, interrupts: dict) -> list:
+    """IRQs of a NIC: its MSI vectors, else /proc/interrupts labels naming it or its device."""
+    dev = root / "sys/class/net" / iface / "device"
+    irqs = set()
+    msi = dev / "msi_irqs"
+    if msi.is_dir():
+        irqs |= {int(p.name) for p in msi.iterdir() if p.name.isdigit()}
+    names = [iface]
+    if dev.exists():
+        names.append(os.path.basename(os.path.realpath(dev)))   # e.g. virtio0, 0000:00:03.0
+    for irq, info in interrupts.items():
+        if any(re.search(rf"(^|[\s\-]){re.escape(n)}([\s\-:.]|$)", info["label"]) for n in names):
+            irqs.add(irq)
+    out = []
+    for irq in sorted(irqs):
+        info = interrupts.get(irq, {"counts": [], "label": ""})
+        aff = _read(root, f"proc/irq/{irq}/smp_affinity_list").strip()
+        out.append({"irq": irq, "label": info["label"], "counts": info["counts"],
+                    "affinity": parse_list(aff) if aff else []})
+    return out
+
+# ─── Waterwall ───────────────────────────────────────────────────────────────
+def waterwall_threads(root: Path) -> list:
+    """Waterwall processes with each thread's last CPU and allowed CPUs."""
+    procs = []
+    for pdir in (root / "proc").glob("[0-9]*"):
+        if "waterwall" not in _read(pdir, "comm").strip().lower(): continue
+        m = re.search(r"^Cpus_allowed_list:\s*(\S+)", _read(pdir, "status"), re.M)
+        allowed = parse_list(m.group(1)) if m else []
+        threads = []
+        for tdir in sorted((pdir / "task").glob("[0-9]*"), key=lambda p: int(p.name)):
+            stat = _read(tdir, "stat")
+            f = stat[stat.rfind(")") + 2:].split()    # f[0] is field 3 (state)
+            if len(f) < 37: continue
+            threads.append({"tid": int(tdir.name), "name": _read(tdir, "comm").strip(),
+                            "cpu": int(f[36]), "cpu_ticks": int(f[11]) + int(f[12])})
+        procs.append({"pid": int(pdir.name), "allowed": allowed, "threads": threads})
+    return sorted(procs, key=lambda p: p["pid"])
+
+def configured_workers(core_path: Path):
+    try:
+        return int(json.loads(core_path.read_text())["misc"]["workers"])
+    except Exception:
+        return None
+
+# ─── Advisor ─────────────────────────────────────────────────────────────────
+def queue_index(label: str) -> int:
+    """'virtio0-input.1' / 'eth0-TxRx-1' / 'mlx5_comp1@pci:0000:3b:00.0' -> 1; no queue suffix -> 0"""
+    name = re.sub(r"@\S*$", "", label.strip())            # drop mlx5/gve '@pci:<bdf>' device suffix
+    m = re.search(r"[.\-_][A-Za-z]*(\d+)$", name)
+    return int(m.group(1)) if m else 0
+
+def plan(cpus, ifaces, usage):
+    """Recommended workers, IRQ affinity and RPS/XPS masks."""
+    n = len(cpus)
+    p = {"workers": max(n, 1), "worker_cpus": list(cpus), "irq_cpus": [],
+         "irq_affinity": {}, "rps": {}, "xps": {}, "rfs": {}, "notes": []}
+    if n <= 1:
+        p["notes"].append("Single CPU: nothing to spread; keep misc.workers = 1.")
+        return p
+    # Hardware queues: queue i's IRQs (rx, tx, combined) -> CPU i (mod n); config IRQs with queue 0
+    for nic in ifaces:
+        for q in nic["irqs"]:
+            cpu = cpus[queue_index(q["label"]) % n]
+            p["irq_affinity"][q["irq"]] = cpu
+            if cpu not in p["irq_cpus"]: p["irq_cpus"].append(cpu)
+    # With 3+ cores, keep the IRQ cores out of RPS and Waterwall's set
+    reserved = p["irq_cpus"] if n > 2 and len(p["irq_cpus"]) < n else []
+    spread = [c for c in cpus if c not in reserved] or list(cpus)
+    for nic in ifaces:
+        rxq = nic["queues"]["rx"]
+        if len(rxq) >= n and len({queue_index(q["label"]) for q in nic["irqs"]}) >= n:
+            continue                                   # multiqueue NIC already covers every core
+        for q in rxq:
+            key = f"{nic['name']}/{q['queue']}"
+            p["rps"][key] = format_mask(spread)
+            p["rfs"][key] = RFS_ENTRIES // max(len(rxq), 1)
+        txq = nic["queues"]["tx"]
+        if len(txq) > 1:
+            for i, q in enumerate(txq):
+                p["xps"][f"{nic['name']}/{q['queue']}"] = format_mask([cpus[i % n]])
+    p["worker_cpus"] = spread
+    p["workers"] = len(spread)
+    hot = [c for c in cpus if usage.get(c, {}).get("softirq", 0) >= SOFTIRQ_HOT]
+    if len(hot) == 1 and n > 1:
+        p["notes"].append(f"Softirq load is concentrated on CPU{hot[0]}; RPS spreads packet processing.")
+    if reserved:
+        p["notes"].append(f"NIC interrupts run on CPU {format_list(reserved)}; Waterwall workers use CPU {format_list(spread)}.")
+    p["notes"].append("If irqbalance is running it may override IRQ affinity (systemctl stop irqbalance, or ban these IRQs).")
+    return p
+
+def commands(p, core_path: Path, workers=None):
+    out = [f"echo {cpu} > /proc/irq/{irq}/smp_affinity_list" for irq, cpu in sorted(p["irq_affinity"].items())]
+    if p["rfs"]:
+        out.append(f"sysctl -w net.core.rps_sock_flow_entries={RFS_ENTRIES}")
+    for key, mask in sorted(p["rps"].items()):
+        iface, q = key.split("/")
+        out.append(f"echo {mask} > /sys/class/net/{iface}/queues/{q}/rps_cpus")
+        out.append(f"echo {p['rfs'][key]} > /sys/class/net/{iface}/queues/{q}/rps_flow_cnt")
+    for key, mask in sorted(p["xps"].items()):
+        iface, q = key.split("/")
+        out.append(f"echo {mask} > /sys/class/net/{iface}/queues/{q}/xps_cpus")
+    if workers != p["workers"]:
+        out.append(f"jq '.misc.workers = {p['workers']}' {core_path} > /tmp/core.json && mv /tmp/core.json {core_path}")
+    out.append(f"# zextunnel.service [Service]: CPUAffinity={format_list(p['worker_cpus']).replace(',', ' ')}")
+    return out
+
+def analyze(root="/", interval=1.0, core_path=None, tun=TUN_IFACE) -> dict:
+    root = Path(root)
+    core_path = Path(core_path) if core_path else BASE_DIR / "core.json"
+    usage = cpu_usage(root, interval)
+    cpus = sorted(usage)
+    interrupts = parse_interrupts(_read(root, "proc/interrupts"))
+    names = [i for i in (default_iface(root), tun) if i and (root / "sys/class/net" / i).exists()]
+    ifaces = [{"name": i, "role": "tunnel" if i == tun else "uplink",
+               "queues": iface_queues(root, i), "irqs": iface_irqs(root, i, interrupts)} for i in names]
+    ww = waterwall_threads(root)
+    cores = []
+    for c in cpus:
+        u = usage[c]
+        cores.append({"cpu": c, **u, "saturated": u["busy"] >= SATURATED,
+                      "irqs": [q["irq"] for nic in ifaces for q in nic["irqs"]
+                               if c < len(q["counts"]) and q["counts"][c] > 0],
+                      "waterwall_threads": sum(1 for p in ww for t in p["threads"] if t["cpu"] == c)})
+    rec = plan(cpus, ifaces, usage)
+    workers = configured_workers(core_path)
+    busy_ww = {c["cpu"] for c in cores if c["saturated"] and c["waterwall_threads"]}
+    if busy_ww and workers == 1:
+        rec["notes"].insert(0, f"Waterwall runs 1 worker and its core (CPU {format_list(busy_ww)}) is saturated.")
+    rec["commands"] = commands(rec, core_path, workers)
+    return {"root": str(root), "interval": interval, "cores": cores, "ifaces": ifaces,
+            "waterwall": {"processes": ww, "workers": workers, "core_json": str(core_path)},
+            "plan": rec}
+
+# ─── CLI ─────────────────────────────────────────────────────────────────────
+def render_text(r) -> str:
+    out = ["Per-core load" + (f" (over {r['interval']}s)" if r["interval"] else " (since boot)"),
+           "  CPU   busy%  softirq%  irq%  steal%  NIC IRQs        Waterwall threads"]
+    for c in r["cores"]:
+        flag = "  << saturated" if c["saturated"] else ""
+        out.append(f"  {c['cpu']:<4}{c['busy']:>7}{c['softirq']:>10}{c['irq']:>6}{c['steal']:>8}  "
+                   f"{','.join(map(str, c['irqs'])) or '-':<16}{c['waterwall_threads']:>4}{flag}")
+    out.append("")
+    for nic in r["ifaces"]:
+        out.append(f"{nic['name']} ({nic['role']}): {len(nic['queues']['rx'])} rx / {len(nic['queues']['tx'])} tx queues")
+        for q in nic["queues"]["rx"]:
+            out.append(f"  {q['queue']}: rps_cpus={format_mask(q['rps_cpus'])} rps_flow_cnt={q['rps_flow_cnt']}")
+        for q in nic["queues"]["tx"]:
+            out.append(f"  {q['queue']}: xps_cpus={format_mask(q['xps_cpus'])}")
+        for q in nic["irqs"]:
+            out.append(f"  IRQ {q['irq']} {q['label']}: affinity={format_list(q['affinity']) or '?'}")
+    if not r["ifaces"]:
+        out.append("No uplink / tunnel interface found.")
+    out.append("")
+    ww = r["waterwall"]
+    out.append(f"Waterwall: misc.workers={ww['workers'] if ww['workers'] is not None else 'N/A'} ({ww['core_json']})")
+    for p in ww["processes"]:
+        out.append(f"  PID {p['pid']} allowed CPUs {format_list(p['allowed']) or '?'}: "
+                   + ", ".join(f"{t['tid']}@CPU{t['cpu']}" for t in p["threads"]))
+    if not ww["processes"]:
+        out.append("  not running")
+    out.append("")
+    pl = r["plan"]
+    out.append(f"Recommendation: misc.workers = {pl['workers']}, workers on CPU {format_list(pl['worker_cpus'])}")
+    out += [f"  - {n}" for n in pl["notes"]]
+    out.append("")
+    out.append("Commands (review before running as root; not persistent across reboot):")
+    out += [f"  {c}" for c in pl["commands"]]
+    return "\n".join(out)
+
+def main():
+    ap = argparse.ArgumentParser(description="Waterwall CPU / NIC queue affinity advisor")
+    ap.add_argument("--root", default="/", help="filesystem root holding proc/ and sys/")
+    ap.add_argument("--interval", type=float, default=1.0, help="sampling window in seconds (0 = since boot)")
+    ap.add_argument("--core", default=None, help="path to Waterwall core.json")
+    ap.add_argument("--tun", default=TUN_IFACE, help="tunnel interface name")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+    r = analyze(args.root, args.interval, args.core, args.tun)
+    print(json.dumps(r, indent=2) if args.json else render_text(r))
+
+if __name__ == "__main__":
+    main()
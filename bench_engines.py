@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# ZEX Tunnel Web Panel V3 — engine benchmark (eventlet vs asyncio)
+#
+# Starts web.py once per engine on a spare port, logs in, attaches N Socket.IO
+# clients and reports connect/init latency, `stats` emit latency (server `ts`
+# to client receipt), delivered event rate, and server RSS / CPU.
+#
+#   pip3 install aiohttp "python-socketio[client]"
+#   python3 bench_engines.py --clients 1,10,50 --duration 15
+
+import argparse, asyncio, json, os, shutil, subprocess, sys, tempfile, time
+import urllib.request, urllib.parse, http.cookiejar
+from pathlib import Path
+import psutil, socketio
+
+WEB_PY = Path(__file__).with_name("web.py")
+# Copied into a scratch dir per run so logs, web.zex and metrics.db of the live panel stay untouched
+SANDBOX_FILES = ("web.py", "web_asgi.py", "metrics_store.py", "affinity.py", "profiler.py", "web.zex")
+
+def password():
+    lines = WEB_PY.with_name("web.zex").read_text(encoding="utf-8").splitlines()
+    return lines[2].strip() if len(lines) >= 3 and lines[2].strip() else "mdo"
+
+def pct(xs, q):
+    if not xs: return float("nan")
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(q / 100 * (len(xs) - 1))))]
+
+def login(base, pw, timeout=20.0):
+    """Wait for the server, then POST the password; returns the Cookie header."""
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    deadline = time.time() + timeout
+    while True:
+        try:
+            opener.open(base + "/", data=urllib.parse.urlencode({"pw": pw}).encode(), timeout=2).read()
+            break
+        except OSError:
+            if time.time() > deadline: raise
+            time.sleep(0.2)
+    cookie = "; ".join(f"{c.name}={c.value}" for c in jar)
+    if not cookie: raise RuntimeError("login failed (wrong password in web.zex?)")
+    return cookie
+
+async def client(base, cookie, duration, out):
+    sio = socketio.AsyncClient(reconnection=False)
+    got_init = asyncio.Event()
+    t0 = time.perf_counter()
+
+    @sio.on("init")
+    async def _init(_):
+        out["init"].append((time.perf_counter() - t0) * 1000)
+        got_init.set()
+
+    @sio.on("stats")
+    async def _stats(s):
+        out["n"] += 1
+        if "ts" in s: out["lat"].append((time.time() - s["ts"]) * 1000)
+
+    try:
+        await sio.connect(base, headers={"Cookie": cookie}, transports=["websocket"], wait_timeout=10)
+        out["connected"] += 1
+        await asyncio.wait_for(got_init.wait(), 10)
+        await asyncio.sleep(duration)
+    except Exception as e:
+        out["errors"].append(str(e))
+    finally:
+        await sio.disconnect()
+
+async def run_level(base, cookie, n, duration, proc):
+    out = {"init": [], "lat": [], "n": 0, "connected": 0, "errors": []}
+    ps = psutil.Process(proc.pid)
+    cpu0, rss_peak = ps.cpu_times(), 0
+    tasks = [asyncio.ensure_future(client(base, cookie, duration, out)) for _ in range(n)]
+    while not all(t.done() for t in tasks):
+        rss_peak = max(rss_peak, ps.memory_info().rss)
+        await asyncio.sleep(0.25)
+    cpu1 = ps.cpu_times()
+    busy = (cpu1.user + cpu1.system) - (cpu0.user + cpu0.system)
+    return {
+        "clients": n,
+        "connected": out["connected"],
+        "errors": len(out["errors"]),
+        "init_p50_ms": round(pct(out["init"], 50), 1),
+        "init_p95_ms": round(pct(out["init"], 95), 1),
+        "emit_p50_ms": round(pct(out["lat"], 50), 2),
+        "emit_p95_ms": round(pct(out["lat"], 95), 2),
+        "emit_p99_ms": round(pct(out["lat"], 99), 2),
+        "stats_per_client_s": round(out["n"] / max(n, 1) / duration, 2),
+        "rss_peak_mb": round(rss_peak / 2**20, 1),
+        "cpu_pct": round(100 * busy / duration, 1),
+    }
+
+def bench_engine(engine, port, levels, duration):
+    base = f"http://127.0.0.1:{port}"
+    tmp = Path(tempfile.mkdtemp(prefix="zexbench-"))
+    for name in SANDBOX_FILES:
+        if WEB_PY.with_name(name).exists(): shutil.copy2(WEB_PY.with_name(name), tmp / name)
+    proc = subprocess.Popen([sys.executable, str(tmp / "web.py"), "--engine", engine, "--port", str(port)],
+                            cwd=tmp, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                            env={**os.environ, "PYTHONUNBUFFERED": "1",
+                                 "ZEX_METRICS_DB": str(tmp / "metrics.db")})
+    try:
+        cookie = login(base, password())
+        time.sleep(1.0)   # let the first poll ticks settle
+        idle_rss = psutil.Process(proc.pid).memory_info().rss
+        rows = []
+        for n in levels:
+            row = asyncio.run(run_level(base, cookie, n, duration, proc))
+            row.update(engine=engine, idle_rss_mb=round(idle_rss / 2**20, 1))
+            rows.append(row)
+        return rows
+    finally:
+        proc.terminate()
+        try: proc.wait(10)
+        except subprocess.TimeoutExpired: proc.kill(); proc.wait()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+COLS = ("engine", "clients", "connected", "errors", "init_p50_ms", "init_p95_ms",
+        "emit_p50_ms", "emit_p95_ms", "emit_p99_ms", "stats_per_client_s",
+        "idle_rss_mb", "rss_peak_mb", "cpu_pct")
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare web.py serving engines")
+    ap.add_argument("--engines", default="eventlet,asyncio")
+    ap.add_argument("--clients", default="1,10,50", help="comma-separated concurrency levels")
+    ap.add_argument("--duration", type=float, default=15.0, help="seconds per level")
+    ap.add_argument("--port", type=int, default=18989, help="first port to use")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+    levels = [int(x) for x in args.clients.split(",") if x]
+    rows = []
+    for i, engine in enumerate(e for e in args.engines.split(",") if e):
+        rows += bench_engine(engine, args.port + i, levels, args.duration)
+    if args.json:
+        print(json.dumps(rows, indent=2)); return
+    widths = [max(len(c), *(len(str(r[c])) for r in rows)) for c in COLS]
+    print("  ".join(c.rjust(w) for c, w in zip(COLS, widths)))
+    for r in rows:
+        print("  ".join(str(r[c]).rjust(w) for c, w in zip(COLS, widths)))
+
+if __name__ == "__main__":
+    main()
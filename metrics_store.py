@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# ZEX Tunnel Web Panel V3 — persistent metrics store (SQLite WAL, batched writes, rollups)
+
+import os, sys, sqlite3, time, collections
+from pathlib import Path
+
+def _original(name: str):
+    # The panel may run under eventlet.monkey_patch(); the writer must be a real OS thread
+    if "eventlet" in sys.modules:
+        from eventlet import patcher
+        return patcher.original(name)
+    return __import__(name)
+
+_threading = _original("threading")
+
+# ─── Tiers ───────────────────────────────────────────────────────────────────
+# (bucket seconds, retention seconds). Every tier is filled on write, so a range
+# query only reads the one tier whose resolution fits the requested span.
+TIERS = (
+    (1,    2 * 86400),       # raw samples, 2 days
+    (60,   30 * 86400),      # 1-minute rollups, 30 days
+    (3600, 400 * 86400),     # 1-hour rollups, ~13 months
+)
+FLUSH_EVERY   = 5.0          # seconds between batched writes
+COMPACT_EVERY = 300.0        # seconds between expiry / budget passes
+QUEUE_MAX     = 4096         # pending samples kept in memory (oldest dropped)
+SCAN_MAX      = 20000        # rows a range query may read before moving to a coarser tier
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples(
+    res INTEGER NOT NULL, ts INTEGER NOT NULL, n INTEGER NOT NULL,
+    cpu REAL, ram REAL, disk REAL,
+    rx REAL, tx REAL, rx_max REAL, tx_max REAL,
+    rx_total INTEGER, tx_total INTEGER, tunnel REAL,
+    PRIMARY KEY(res, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ports(
+    res INTEGER NOT NULL, port INTEGER NOT NULL, proto TEXT NOT NULL, ts INTEGER NOT NULL,
+    n INTEGER NOT NULL, up REAL, conns REAL, conns_max INTEGER,
+    PRIMARY KEY(res, port, proto, ts)
+) WITHOUT ROWID;
+"""
+
+# Weighted-average merge of a new bucket into an existing one (n = samples in bucket)
+def _avg(col): return f"{col}=({col}*n + excluded.{col}*excluded.n)/(n + excluded.n)"
+def _max(col): return f"{col}=max({col}, excluded.{col})"
+
+UPSERT_SAMPLE = (
+    "INSERT INTO samples(res,ts,n,cpu,ram,disk,rx,tx,rx_max,tx_max,rx_total,tx_total,tunnel) "
+    "VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?) ON CONFLICT(res,ts) DO UPDATE SET "
+    + ", ".join([_avg("cpu"), _avg("ram"), _avg("disk"), _avg("rx"), _avg("tx"),
+                 _max("rx_max"), _max("tx_max"), _max("rx_total"), _max("tx_total"),
+                 _avg("tunnel"), "n=n + excluded.n"])
+)
+UPSERT_PORT = (
+    "INSERT INTO ports(res,port,proto,ts,n,up,conns,conns_max) VALUES(?,?,?,?,?,?,?,?) "
+    "ON CONFLICT(res,port,proto,ts) DO UPDATE SET "
+    + ", ".join([_avg("up"), _avg("conns"), _max("conns_max"), "n=n + excluded.n"])
+)
+SAMPLE_COLS = ("cpu", "ram", "disk", "rx", "tx", "rx_max", "tx_max", "rx_total", "tx_total", "tunnel")
+
+def _bucket(rows, res, key):
+    """Pre-aggregate raw rows into `res`-second buckets before they hit SQLite."""
+    out = {}
+    for r in rows:
+        k = key(r, r["ts"] - r["ts"] % res)
+        out.setdefault(k, []).append(r)
+    return out
+
+# ─── Store ───────────────────────────────────────────────────────────────────
+class MetricsStore:
+    """
+    Time-series store for panel stats and per-port tunnel counters.
+    record() only appends to an in-memory queue; a background thread writes
+    batches, expires old raw rows and keeps the database under `max_bytes`.
+    """
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024, log=print):
+        self.path      = Path(path)
+        self.max_bytes = int(max_bytes)
+        self.wal_bytes = max(self.max_bytes // 8, 4096)     # share of the budget left for the -wal file
+        self.log       = log
+        self._pending  = collections.deque(maxlen=QUEUE_MAX)
+        self._wake     = _threading.Event()
+        self._stop     = False
+        self._thread   = None
+        db = self._connect()
+        try:
+            db.executescript(SCHEMA)
+            if db.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                db.execute("VACUUM")                         # needed once to switch an existing file
+        finally:
+            db.close()
+
+    def _connect(self):
+        db = sqlite3.connect(str(self.path), timeout=10, check_same_thread=False)
+        db.execute("PRAGMA auto_vacuum=INCREMENTAL")     # only applies to a fresh file
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(f"PRAGMA journal_size_limit={self.wal_bytes}")
+        page = db.execute("PRAGMA page_size").fetchone()[0]
+        db.execute(f"PRAGMA wal_autocheckpoint={max(self.wal_bytes // page, 1)}")
+        return db
+
+    # ── writer side ──
+    def start(self):
+        if self._thread is None:
+            self._thread = _threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        self._stop = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def record(self, sample: dict, ports=(), ts=None):
+        """
+        Queue one poll. `sample` keys: cpu, ram, disk, rx, tx (bytes/s),
+        rx_total, tx_total, tunnel (0/1). `ports`: dicts with port, proto, up, conns.
+        """
+        self._pending.append({"ts": int(ts if ts is not None else time.time()),
+                              "sample": sample, "ports": list(ports)})
+
+    def _run(self):
+        db = self._connect()
+        last_compact = 0.0
+        try:
+            while not self._stop:
+                self._wake.wait(FLUSH_EVERY)
+                self._wake.clear()
+                try:
+                    self.flush(db)
+                    if time.monotonic() - last_compact >= COMPACT_EVERY:
+                        self.compact(db)
+                        last_compact = time.monotonic()
+                except sqlite3.Error as e:
+                    self.log(f"[ERR metrics] {e}")
+            self.flush(db)
+        finally:
+            db.close()
+
+    def flush(self, db):
+        batch = []
+        while self._pending:
+            batch.append(self._pending.popleft())
+        if not batch:
+            return 0
+        srows, prows = [], []
+        for res, _ in TIERS:
+            for (ts,), rows in _bucket(batch, res, lambda r, b: (b,)).items():
+                vals = [r["sample"] for r in rows]
+                n = len(vals)
+                avg = lambda k: sum(float(v.get(k) or 0) for v in vals) / n
+                top = lambda k: max(float(v.get(k) or 0) for v in vals)
+                srows.append((res, ts, n, avg("cpu"), avg("ram"), avg("disk"), avg("rx"), avg("tx"),
+                              top("rx"), top("tx"), int(top("rx_total")), int(top("tx_total")), avg("tunnel")))
+            flat = [{"ts": r["ts"], **p} for r in batch for p in r["ports"]]
+            for (port, proto, ts), rows in _bucket(flat, res, lambda r, b: (int(r["port"]), str(r["proto"]), b)).items():
+                n = len(rows)
+                prows.append((res, port, proto, ts, n,
+                              sum(float(r.get("up") or 0) for r in rows) / n,
+                              sum(float(r.get("conns") or 0) for r in rows) / n,
+                              max(int(r.get("conns") or 0) for r in rows)))
+        try:
+            with db:
+                db.executemany(UPSERT_SAMPLE, srows)
+                db.executemany(UPSERT_PORT, prows)
+        except sqlite3.Error:
+            # Retry on the next flush; if polls filled the queue meanwhile, the
+            # oldest samples (the front of this batch) are the ones dropped
+            free = QUEUE_MAX - len(self._pending)
+            self._pending.extendleft(reversed(batch[max(len(batch) - free, 0):]))
+            raise
+        return len(batch)
+
+    def compact(self, db, now=None):
+        """Drop rows past each tier's retention, then enforce the disk budget."""
+        now = int(now if now is not None else time.time())
+        with db:
+            for res, keep in TIERS:
+                db.execute("DELETE FROM samples WHERE res=? AND ts<?", (res, now - keep))
+                db.execute("DELETE FROM ports   WHERE res=? AND ts<?", (res, now - keep))
+        self._shrink(db)
+        # Over budget: give up the oldest half of the finest tier that still has
+        # history; its data survives in the coarser rollups. The -wal file is
+        # capped at wal_bytes, so the main file has to fit in what is left.
+        for _ in range(32):
+            if self.disk_bytes() <= self.max_bytes - self.wal_bytes:
+                break
+            for res, _ in TIERS:
+                lo, hi = db.execute("SELECT min(ts), max(ts) FROM samples WHERE res=?", (res,)).fetchone()
+                if lo is not None and hi - lo > res:
+                    cut = lo + (hi - lo) // 2
+                    with db:
+                        db.execute("DELETE FROM samples WHERE res=? AND ts<?", (res, cut))
+                        db.execute("DELETE FROM ports   WHERE res=? AND ts<?", (res, cut))
+                    break
+            else:
+                break
+            self._shrink(db)
+
+    @staticmethod
+    def _shrink(db):
+        """Return free pages to the filesystem and truncate the -wal file."""
+        while db.execute("PRAGMA freelist_count").fetchone()[0]:
+            db.execute("PRAGMA incremental_vacuum(1024)").fetchall()   # fetchall steps it to completion
+        db.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+
+    def disk_bytes(self):
+        """Real on-disk size: main file plus -wal."""
+        total = 0
+        for p in (self.path, self.path.with_name(self.path.name + "-wal")):
+            try: total += os.path.getsize(p)
+            except OSError: pass
+        return total
+
+    # ── reader side ──
+    @staticmethod
+    def pick_tier(db, start, end):
+        """
+        Finest tier that still holds data back to `start` without reading more
+        than SCAN_MAX rows. Coverage comes from each tier's oldest stored row,
+        since compact() may have trimmed a tier well inside its retention.
+        """
+        span = max(end - start, 1)
+        oldest = {res: db.execute("SELECT min(ts) FROM samples WHERE res=?", (res,)).fetchone()[0]
+                  for res, _ in TIERS}
+        for i, (res, _) in enumerate(TIERS):
+            first = oldest[res]
+            if first is None or span / res > SCAN_MAX:
+                continue
+            # A coarser tier with a whole bucket before `first` means this one was trimmed
+            trimmed = any(oldest[r] is not None and oldest[r] + r <= first for r, _ in TIERS[i + 1:])
+            if first <= start - start % res or not trimmed:
+                return res
+        return TIERS[-1][0]
+
+    def history(self, start, end, max_points=500, port=None):
+        """Range query; reads only the chosen tier's index range."""
+        start, end = int(start), int(end)
+        db = sqlite3.connect(str(self.path), timeout=10)
+        try:
+            res = self.pick_tier(db, start, end)
+            step = max(res, -(-(end - start) // max(max_points, 1) // res) * res)
+            lo = start - start % res                        # keep the partial leading bucket
+            if port is None:
+                rows = db.execute(
+                    "SELECT (ts/?1)*?1 AS t, sum(n), "
+                    + ", ".join(f"max({c})" if c.endswith(("_max", "_total")) else f"sum({c}*n)/sum(n)"
+                                for c in SAMPLE_COLS)
+                    + " FROM samples WHERE res=?2 AND ts BETWEEN ?3 AND ?4 GROUP BY t ORDER BY t",
+                    (step, res, lo, end)).fetchall()
+                cols = ("ts", "n") + SAMPLE_COLS
+            else:
+                rows = db.execute(
+                    "SELECT proto, (ts/?1)*?1 AS t, sum(n), sum(up*n)/sum(n), sum(conns*n)/sum(n), max(conns_max) "
+                    "FROM ports WHERE res=?2 AND port=?3 AND ts BETWEEN ?4 AND ?5 GROUP BY proto, t ORDER BY t",
+                    (step, res, int(port), lo, end)).fetchall()
+                cols = ("proto", "ts", "n", "up", "conns", "conns_max")
+        finally:
+            db.close()
+        return {"res": res, "step": step, "start": start, "end": end,
+                "points": [dict(zip(cols, r)) for r in rows]}
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# ZEX Tunnel Web Panel V3 — poll-loop stage timings + on-demand sampling profiler
+
+import sys, os, time, collections
+from contextlib import contextmanager
+
+def _original(name: str):
+    # Under eventlet.monkey_patch() the sampler still needs a real OS thread and sleep
+    if "eventlet" in sys.modules:
+        from eventlet import patcher
+        return patcher.original(name)
+    return __import__(name)
+
+_threading = _original("threading")
+_time      = _original("time")
+
+# ─── Histograms ──────────────────────────────────────────────────────────────
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float("inf"))
+
+class Histogram:
+    """Fixed log-spaced buckets (ms); percentiles are bucket upper bounds."""
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.n = 0; self.total = 0.0; self.max = 0.0; self.last = 0.0
+
+    def add(self, ms: float):
+        i = 0
+        while ms > BUCKETS_MS[i]: i += 1
+        self.counts[i] += 1
+        self.n += 1; self.total += ms; self.last = ms
+        if ms > self.max: self.max = ms
+
+    def quantile(self, q: float) -> float:
+        if not self.n: return 0.0
+        seen, want = 0, q * self.n
+        for edge, c in zip(BUCKETS_MS, self.counts):
+            seen += c
+            if seen >= want: return edge if edge != float("inf") else self.max
+        return self.max
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.n,
+            "mean": round(self.total / self.n, 3) if self.n else 0.0,
+            "last": round(self.last, 3),
+            "max": round(self.max, 3),
+            "p50": self.quantile(0.50), "p95": self.quantile(0.95), "p99": self.quantile(0.99),
+            "buckets": [[("inf" if e == float("inf") else e), c] for e, c in zip(BUCKETS_MS, self.counts)],
+        }
+
+# ─── Stage timings ───────────────────────────────────────────────────────────
+class Tick:
+    """One poll pass. A stage may be entered several times (e.g. emit); times add up."""
+
+    def __init__(self):
+        self.acc = {}
+
+    @contextmanager
+    def __call__(self, name: str):
+        w0, c0 = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            a = self.acc.setdefault(name, [0.0, 0.0])
+            a[0] += time.perf_counter() - w0
+            a[1] += time.thread_time() - c0
+
+    def timed(self, name: str, fn, *a):
+        """Run fn(*a) inside stage `name` (handy for thread-pool submission)."""
+        with self(name):
+            return fn(*a)
+
+class StageTimings:
+    """
+    Wall and CPU time per poll_loop stage. CPU time is the calling OS thread's;
+    under eventlet that includes any greenlets that ran while the stage waited.
+    """
+
+    def __init__(self):
+        self.stages = collections.OrderedDict()
+        self.lock = _threading.Lock()
+        self.started = time.time()
+
+    def record(self, name: str, wall_s: float, cpu_s: float):
+        with self.lock:
+            h = self.stages.get(name)
+            if h is None:
+                h = self.stages[name] = {"wall": Histogram(), "cpu": Histogram()}
+            h["wall"].add(wall_s * 1000.0)
+            h["cpu"].add(cpu_s * 1000.0)
+
+    @contextmanager
+    def tick(self):
+        t = Tick()
+        with t("tick"):
+            yield t
+        for name, (wall, cpu) in t.acc.items():
+            self.record(name, wall, cpu)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            stages = {k: {"wall_ms": v["wall"].snapshot(), "cpu_ms": v["cpu"].snapshot()}
+                      for k, v in self.stages.items()}
+        return {"since": self.started, "stages": stages}
+
+# ─── Sampling profiler ───────────────────────────────────────────────────────
+_profile_lock = _threading.Lock()
+
+def _frame_name(f) -> str:
+    co = f.f_code
+    return f"{co.co_name} ({os.path.basename(co.co_filename)}:{co.co_firstlineno})"
+
+def sample_stacks(seconds: float, hz: int = 100) -> dict:
+    """
+    Sample every thread's stack `hz` times a second for `seconds` from a real
+    OS thread. Returns {"folded stack": samples}; stacks are root-first and
+    prefixed with the thread name (flamegraph.pl / speedscope "collapsed" format).
+    Under eventlet only the greenlet currently running on each OS thread is
+    visible; switched-out greenlets (sleeping poll loop, parked requests) are not.
+    """
+    counts = collections.Counter()
+    me = _threading.get_ident()
+    period = 1.0 / max(hz, 1)
+    end = _time.monotonic() + seconds
+    while _time.monotonic() < end:
+        names = {t.ident: t.name for t in _threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me: continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame)); frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            counts[";".join(reversed(stack))] += 1
+        _time.sleep(period)
+    return counts
+
+def profile(seconds: float, hz: int = 100):
+    """
+    Run sample_stacks on its own OS thread and wait for it with the caller's
+    (possibly green) sleep. Returns folded-stack text, or None if a capture is
+    already running.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        out = {}
+        worker = _threading.Thread(target=lambda: out.update(counts=sample_stacks(seconds, hz)),
+                                   name="zex-profiler", daemon=True)
+        worker.start()
+        while worker.is_alive():
+            time.sleep(0.1)     # green under eventlet, so the panel keeps serving
+        counts = out.get("counts", {})
+        return "".join(f"{stack} {n}\n" for stack, n in sorted(counts.items(), key=lambda kv: -kv[1]))
+    finally:
+        _profile_lock.release()
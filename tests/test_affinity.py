@@ -0,0 +1,88 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import affinity
+
+# 4-core VPS: single-queue virtio uplink (eth0 -> virtio0), wtun0, one Waterwall
+# process whose threads sit on CPU 0/1 while CPU 0 takes all the NIC softirqs.
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "affinity"
+
+def analyze():
+    return affinity.analyze(FIXTURE, interval=0, core_path=FIXTURE / "core.json")
+
+# ─── masks / lists ───────────────────────────────────────────────────────────
+def test_parse_mask():
+    assert affinity.parse_mask("0") == []
+    assert affinity.parse_mask("f\n") == [0, 1, 2, 3]
+    assert affinity.parse_mask("00000001,00000002") == [1, 32]
+
+def test_format_mask():
+    assert affinity.format_mask([]) == "0"
+    assert affinity.format_mask([1, 2, 3]) == "e"
+    assert affinity.format_mask([1, 32]) == "1,00000002"
+    assert affinity.parse_mask(affinity.format_mask([0, 5, 40])) == [0, 5, 40]
+
+def test_parse_and_format_list():
+    assert affinity.parse_list("0-2,5\n") == [0, 1, 2, 5]
+    assert affinity.parse_list("") == []
+    assert affinity.format_list([5, 0, 1, 2]) == "0-2,5"
+
+# ─── /proc + /sys parsing ────────────────────────────────────────────────────
+def test_iface_irqs_matches_device_labels_only():
+    interrupts = affinity.parse_interrupts((FIXTURE / "proc/interrupts").read_text())
+    irqs = affinity.iface_irqs(FIXTURE, "eth0", interrupts)
+    assert [q["irq"] for q in irqs] == [24, 25, 26]          # virtio10-input.0 is not virtio0
+    assert irqs[1]["label"].endswith("virtio0-input.0")
+    assert irqs[1]["affinity"] == [0]
+    assert affinity.iface_irqs(FIXTURE, "wtun0", interrupts) == []
+
+def test_queue_index():
+    assert affinity.queue_index("PCI-MSI 49153-edge virtio0-input.1") == 1
+    assert affinity.queue_index("eth0-TxRx-3") == 3
+    assert affinity.queue_index("virtio0-config") == 0
+    assert affinity.queue_index("IR-PCI-MSI 1572867-edge mlx5_comp3@pci:0000:3b:00.0") == 3
+    assert affinity.queue_index("mlx5_async0@pci:0000:3b:00.0") == 0
+    assert affinity.queue_index("PCI-MSI 524288-edge eth1") == 0
+
+def test_host_snapshot():
+    r = analyze()
+    assert [c["cpu"] for c in r["cores"]] == [0, 1, 2, 3]
+    assert r["cores"][0]["saturated"] and not r["cores"][1]["saturated"]
+    assert r["cores"][0]["softirq"] == 82.0
+    assert [(n["name"], n["role"]) for n in r["ifaces"]] == [("eth0", "uplink"), ("wtun0", "tunnel")]
+    ww = r["waterwall"]
+    assert ww["workers"] == 1
+    assert [(t["tid"], t["cpu"]) for t in ww["processes"][0]["threads"]] == [(1234, 0), (1235, 1)]
+
+# ─── plan ────────────────────────────────────────────────────────────────────
+def test_plan_single_queue_virtio():
+    p = analyze()["plan"]
+    assert p["workers"] == 3
+    assert p["worker_cpus"] == [1, 2, 3]
+    assert p["irq_affinity"] == {24: 0, 25: 0, 26: 0}
+    assert p["rps"] == {"eth0/rx-0": "e", "wtun0/rx-0": "e"}
+    assert p["rfs"] == {"eth0/rx-0": 32768, "wtun0/rx-0": 32768}
+    assert "echo e > /sys/class/net/eth0/queues/rx-0/rps_cpus" in p["commands"]
+    assert any(".misc.workers = 3" in c for c in p["commands"])
+
+def test_plan_multiqueue_nic_needs_no_rps():
+    nic = {"name": "eth0", "irqs": [{"irq": 40 + i, "label": f"eth0-TxRx-{i}"} for i in range(4)],
+           "queues": {"rx": [{"queue": f"rx-{i}"} for i in range(4)],
+                      "tx": [{"queue": f"tx-{i}"} for i in range(4)]}}
+    p = affinity.plan([0, 1, 2, 3], [nic], {})
+    assert p["irq_affinity"] == {40: 0, 41: 1, 42: 2, 43: 3}
+    assert p["rps"] == {} and p["workers"] == 4
+
+def test_plan_multiqueue_mlx5_pci_labels():
+    nic = {"name": "eth0", "irqs": [{"irq": 40 + i, "label": f"IR-PCI-MSI {1572864 + i}-edge mlx5_comp{i}@pci:0000:3b:00.0"}
+                                    for i in range(4)],
+           "queues": {"rx": [{"queue": f"rx-{i}"} for i in range(4)],
+                      "tx": [{"queue": f"tx-{i}"} for i in range(4)]}}
+    p = affinity.plan([0, 1, 2, 3], [nic], {})
+    assert p["irq_affinity"] == {40: 0, 41: 1, 42: 2, 43: 3}
+    assert p["rps"] == {} and p["workers"] == 4
+
+def test_plan_single_cpu():
+    p = affinity.plan([0], [], {})
+    assert p["workers"] == 1 and p["rps"] == {}
@@ -0,0 +1,114 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import metrics_store
+
+NOW = 1_700_000_000 - 1_700_000_000 % 3600      # hour-aligned so bucket edges are predictable
+
+def store(tmp_path, max_bytes=64 * 1024 * 1024):
+    s = metrics_store.MetricsStore(tmp_path / "metrics.db", max_bytes=max_bytes, log=lambda m: None)
+    return s, s._connect()
+
+def sample(cpu=0.0, **kw):
+    return {"cpu": cpu, "ram": 0, "disk": 0, "rx": 0, "tx": 0, "rx_total": 0, "tx_total": 0, "tunnel": 1, **kw}
+
+def fill(s, db, start, end, ports=0):
+    for ts in range(start, end):
+        s.record(sample(cpu=ts % 100), [{"port": 1000 + p, "proto": "tcp", "up": 1, "conns": p}
+                                        for p in range(ports)], ts=ts)
+        if len(s._pending) >= 1000:
+            s.flush(db)
+    s.flush(db)
+
+# ─── writes ──────────────────────────────────────────────────────────────────
+def test_rollup_merges_weighted_across_flushes(tmp_path):
+    s, db = store(tmp_path)
+    s.record(sample(cpu=10), ts=NOW); s.record(sample(cpu=20), ts=NOW + 1)
+    s.flush(db)
+    s.record(sample(cpu=70), ts=NOW + 2)
+    s.flush(db)
+    n, cpu = db.execute("SELECT n, cpu FROM samples WHERE res=60 AND ts=?", (NOW,)).fetchone()
+    assert n == 3 and cpu == 100 / 3
+    assert db.execute("SELECT count(*) FROM samples WHERE res=1").fetchone()[0] == 3
+
+def test_failed_flush_keeps_newest_samples(tmp_path):
+    s, db = store(tmp_path)
+    for ts in range(10):
+        s.record(sample(), ts=NOW + ts)
+    db.close()                                           # every write now fails
+    batch_end = NOW + 10
+    try:
+        s.flush(db)
+    except metrics_store.sqlite3.Error:
+        pass
+    assert [r["ts"] for r in s._pending] == list(range(NOW, batch_end))
+    # Queue filled by new polls while the write failed: the batch's oldest go first
+    for ts in range(10):
+        s.record(sample(), ts=NOW + ts)
+    for ts in range(metrics_store.QUEUE_MAX - 5):
+        s._pending.append({"ts": batch_end + ts, "sample": sample(), "ports": []})
+    try:
+        s.flush(db)
+    except metrics_store.sqlite3.Error:
+        pass
+    got = [r["ts"] for r in s._pending]
+    assert len(got) == metrics_store.QUEUE_MAX
+    assert got[:5] == list(range(NOW + 5, NOW + 10)) and got[-1] > got[-2]
+
+# ─── compaction ──────────────────────────────────────────────────────────────
+def test_retention_expiry(tmp_path):
+    s, db = store(tmp_path)
+    old = NOW - 3 * 86400
+    s.record(sample(), ts=old); s.record(sample(), ts=NOW)
+    s.flush(db)
+    s.compact(db, now=NOW)
+    rows = db.execute("SELECT res, ts FROM samples ORDER BY res, ts").fetchall()
+    assert (1, old) not in rows and (1, NOW) in rows
+    assert (60, old - old % 60) in rows and (3600, old - old % 3600) in rows
+
+def test_budget_shrinks_file(tmp_path):
+    s, db = store(tmp_path, max_bytes=256 * 1024)
+    fill(s, db, NOW - 6000, NOW, ports=10)
+    before = s.disk_bytes()
+    assert before > 256 * 1024
+    s.compact(db, now=NOW)
+    assert s.disk_bytes() <= 256 * 1024
+    assert db.execute("PRAGMA freelist_count").fetchone()[0] == 0
+
+# ─── reads ───────────────────────────────────────────────────────────────────
+def test_history_picks_finest_tier(tmp_path):
+    s, db = store(tmp_path)
+    fill(s, db, NOW - 3600, NOW)
+    h = s.history(NOW - 600, NOW, max_points=600)
+    assert h["res"] == 1 and len(h["points"]) == 600
+    h = s.history(NOW - 3600, NOW, max_points=10)
+    assert h["res"] == 1 and h["step"] == 360
+    assert sum(p["n"] for p in h["points"]) == 3600
+
+def test_history_skips_tier_trimmed_by_budget(tmp_path):
+    s, db = store(tmp_path, max_bytes=128 * 1024)
+    fill(s, db, NOW - 8000, NOW, ports=10)
+    s.compact(db, now=NOW)
+    raw_oldest = db.execute("SELECT min(ts) FROM samples WHERE res=1").fetchone()[0]
+    assert raw_oldest > NOW - 7200                       # raw tier gave up its history
+    h = s.history(NOW - 7200, NOW, max_points=500)
+    assert h["res"] > 1
+    assert h["points"][0]["ts"] <= NOW - 7200 + h["step"]
+    assert s.history(raw_oldest, NOW)["res"] == 1        # still finest where raw remains
+
+def test_history_port_query(tmp_path):
+    s, db = store(tmp_path)
+    for ts in range(120):
+        s.record(sample(), [{"port": 443, "proto": "tcp", "up": 1, "conns": ts % 4},
+                            {"port": 443, "proto": "udp", "up": ts % 2, "conns": 1},
+                            {"port": 8443, "proto": "tcp", "up": 0, "conns": 9}], ts=NOW + ts)
+    s.flush(db)
+    h = s.history(NOW, NOW + 119, max_points=2, port=443)
+    assert h["step"] == 60
+    tcp = [p for p in h["points"] if p["proto"] == "tcp"]
+    udp = [p for p in h["points"] if p["proto"] == "udp"]
+    assert [p["ts"] for p in tcp] == [NOW, NOW + 60]
+    assert all(p["conns"] == 1.5 and p["conns_max"] == 3 and p["n"] == 60 for p in tcp)
+    assert all(p["up"] == 0.5 for p in udp)
+    assert s.history(NOW, NOW + 119, port=9999)["points"] == []
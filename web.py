@@ -7,18 +7,33 @@ POLL_INTERVAL = 0.8         # Seconds between polls
 PASSWORD      = "mdo"       # Login password
 DEBUG         = True        # Extra prints
 TOP_N         = 10          # rows for processes / connections / open ports
+METRICS_DB    = "metrics.db" # Persistent stats history (next to web.py)
+METRICS_MB    = 64          # Disk budget for the stats history
+ENGINE        = "eventlet"  # Server engine: "eventlet" or "asyncio" (uvicorn/ASGI)
 # ─────────────────────────────────────────────────────────────────────────────
 
+import os, sys
+def _argv(flag, default):
+    return sys.argv[sys.argv.index(flag) + 1] if flag in sys.argv[:-1] else default
+ENGINE = _argv("--engine", os.environ.get("ZEX_WEB_ENGINE", ENGINE)).lower()
+if ENGINE not in ("eventlet", "asyncio"):
+    sys.exit(f"unknown engine {ENGINE!r} (expected 'eventlet' or 'asyncio')")
+METRICS_DB = os.environ.get("ZEX_METRICS_DB", METRICS_DB)   # absolute path wins over web.py's folder
+
 # eventlet must patch stdlib **before** any other networking import
-import eventlet
-eventlet.monkey_patch()
+if ENGINE == "eventlet":
+    import eventlet
+    eventlet.monkey_patch()
 
-import re, time, threading, secrets, sys, logging, socket, platform
+import re, time, math, threading, secrets, logging, socket, platform
 from pathlib import Path
 from functools import wraps
-from flask import Flask, render_template_string, request, redirect, session, url_for
+from flask import Flask, render_template_string, request, redirect, session, url_for, jsonify
 from flask_socketio import SocketIO, emit
 import psutil
+from metrics_store import MetricsStore
+import affinity
+import profiler
 
 # ─── Settings file (web.zex) ─────────────────────────────────────────────────
 CONFIG_FILE = Path(__file__).with_name("web.zex")
@@ -40,6 +55,7 @@ def load_settings():
     except Exception as e:
         print(f"[WARN] could not parse {CONFIG_FILE}: {e}", file=sys.stderr)
 load_settings()
+PORT = int(_argv("--port", PORT))
 
 # ─── Paths / Logs ────────────────────────────────────────────────────────────
 LOG_DIR   = Path(__file__).resolve().parent / "log"
@@ -49,7 +65,10 @@ TAIL_LAST = 110
 # ─── App / Sockets ───────────────────────────────────────────────────────────
 app            = Flask(__name__)
 app.secret_key = secrets.token_hex(16)
-socketio       = SocketIO(app, cors_allowed_origins="*", async_mode="eventlet",
+# In asyncio mode web_asgi.py serves Socket.IO itself; this instance only keeps
+# the Flask routes importable and is never run.
+socketio       = SocketIO(app, cors_allowed_origins="*",
+                          async_mode="eventlet" if ENGINE == "eventlet" else "threading",
                           manage_session=False)
 
 def dbg(msg: str):
@@ -132,28 +151,46 @@ def bytes_h(n: float) -> str:
     while n>=1024 and i<len(units)-1: n/=1024.0; i+=1
     return f"{n:.1f} {units[i]}"
 
-def get_stats(prev_net):
-    cpu = psutil.cpu_percent(interval=None)
+def read_stats(prev_net):
+    """Raw numbers behind get_stats (also what the metrics store persists)."""
     vm  = psutil.virtual_memory()
     du  = psutil.disk_usage("/")
     ni  = psutil.net_io_counters()
-    rx_rate = max(0, ni.bytes_recv - prev_net.bytes_recv) / max(POLL_INTERVAL, 1e-6)
-    tx_rate = max(0, ni.bytes_sent - prev_net.bytes_sent) / max(POLL_INTERVAL, 1e-6)
-    stats = {
-        "cpu_pct": round(cpu,1),
-        "ram_pct": round(vm.percent,1),
-        "ram_used": bytes_h(vm.total - vm.available),
-        "ram_total": bytes_h(vm.total),
-        "disk_pct": round(du.percent,1),
-        "disk_used": bytes_h(du.used),
-        "disk_total": bytes_h(du.total),
-        "net_rx_rate": bytes_h(rx_rate) + "/s",
-        "net_tx_rate": bytes_h(tx_rate) + "/s",
-        "net_rx_total": bytes_h(ni.bytes_recv),
-        "net_tx_total": bytes_h(ni.bytes_sent),
+    raw = {
+        "cpu": psutil.cpu_percent(interval=None),
+        "ram": vm.percent,
+        "ram_used": vm.total - vm.available,
+        "ram_total": vm.total,
+        "disk": du.percent,
+        "disk_used": du.used,
+        "disk_total": du.total,
+        "rx": max(0, ni.bytes_recv - prev_net.bytes_recv) / max(POLL_INTERVAL, 1e-6),
+        "tx": max(0, ni.bytes_sent - prev_net.bytes_sent) / max(POLL_INTERVAL, 1e-6),
+        "rx_total": ni.bytes_recv,
+        "tx_total": ni.bytes_sent,
+    }
+    return raw, ni
+
+def format_stats(raw):
+    return {
+        "cpu_pct": round(raw["cpu"],1),
+        "ram_pct": round(raw["ram"],1),
+        "ram_used": bytes_h(raw["ram_used"]),
+        "ram_total": bytes_h(raw["ram_total"]),
+        "disk_pct": round(raw["disk"],1),
+        "disk_used": bytes_h(raw["disk_used"]),
+        "disk_total": bytes_h(raw["disk_total"]),
+        "net_rx_rate": bytes_h(raw["rx"]) + "/s",
+        "net_tx_rate": bytes_h(raw["tx"]) + "/s",
+        "net_rx_total": bytes_h(raw["rx_total"]),
+        "net_tx_total": bytes_h(raw["tx_total"]),
         "uptime": int(time.time() - psutil.boot_time()),
+        "ts": round(time.time(), 3),   # server emit time (latency benchmarks)
     }
-    return stats, ni
+
+def get_stats(prev_net):
+    raw, ni = read_stats(prev_net)
+    return format_stats(raw), ni
 
 def get_top_processes(n=TOP_N):
     procs = []
@@ -237,10 +274,12 @@ def get_tunnel_status(tunnel_port_str: str, n=TOP_N):
     """
     Show only LISTEN sockets of Waterwall. Columns: Proto, Port, PID.
     Active = Waterwall LISTENs on configured tunnel port.
+    Each entry also carries `conns`: ESTABLISHED sockets on that local port.
     """
     entries = []
     active = False
     pname_cache = {}
+    established = {}
     # parse configured port if possible
     try:
         tp = int(str(tunnel_port_str).strip())
@@ -249,6 +288,8 @@ def get_tunnel_status(tunnel_port_str: str, n=TOP_N):
 
     for c in psutil.net_connections(kind="inet"):
         try:
+            if c.status == psutil.CONN_ESTABLISHED and c.laddr:
+                established[c.laddr.port] = established.get(c.laddr.port, 0) + 1
             if c.status != psutil.CONN_LISTEN:
                 continue
             pid = c.pid or 0
@@ -278,47 +319,100 @@ def get_tunnel_status(tunnel_port_str: str, n=TOP_N):
         except Exception:
             continue
 
+    for e in entries:
+        e["conns"] = established.get(int(e["port"]), 0) if e["port"].isdigit() else 0
     # sort by port asc
     entries.sort(key=lambda e: int(e["port"]) if e["port"].isdigit() else 0)
     return {"active": active, "entries": entries[:n]}
 
+# ─── Metrics history (persistent) ────────────────────────────────────────────
+store = MetricsStore(Path(__file__).resolve().parent / METRICS_DB,
+                     max_bytes=METRICS_MB * 1024 * 1024, log=dbg)
+
+def record_metrics(raw, tunnel):
+    ports = {}
+    for e in tunnel.get("entries", []):
+        if not e["port"].isdigit(): continue
+        p = ports.setdefault((int(e["port"]), e["proto"]), {"port": int(e["port"]), "proto": e["proto"], "up": 1, "conns": 0})
+        p["conns"] = max(p["conns"], e.get("conns", 0))
+    sample = {k: raw[k] for k in ("cpu", "ram", "disk", "rx", "tx", "rx_total", "tx_total")}
+    sample["tunnel"] = int(bool(tunnel.get("active")))
+    store.record(sample, ports.values())
+
 # ─── Polling loop ────────────────────────────────────────────────────────────
 offsets: dict[Path, int] = {}
 _prev_net = psutil.net_io_counters()
+def read_log_updates():
+    """New bytes appended to each log since the previous call."""
+    updates = []
+    for p in ordered_files():
+        try:
+            if p not in offsets: offsets[p] = p.stat().st_size
+            size = p.stat().st_size
+            if size > offsets[p]:
+                with p.open("rb") as fh:
+                    fh.seek(offsets[p]); data = fh.read()
+                offsets[p] = size
+                updates.append({"filename": p.name, "content": data.decode(errors="ignore")})
+        except Exception as e:
+            dbg(f"[ERR] {p}: {e}")
+    return updates
+
+def init_payload():
+    stats, _ = get_stats(psutil.net_io_counters())
+    tinfo = read_tunnel_info()
+    return {
+        "logs": [{"filename": p.name, "content": tail(p, TAIL_LAST)} for p in ordered_files()],
+        "stats": stats,
+        "tables": {
+            "procs": get_top_processes(),
+            "conns": get_live_connections(),
+            "ports": get_open_ports(),
+            "tunnel": get_tunnel_status(tinfo.get("port",""))
+        }
+    }
+
+timings = profiler.StageTimings()   # per-stage wall/CPU histograms (/debug)
+
 def poll_loop():
     global _prev_net
     while True:
-        # logs
-        for p in ordered_files():
+        with timings.tick() as stage:
+            # logs
+            with stage("logs"):
+                updates = read_log_updates()
+            with stage("emit"):
+                for upd in updates:
+                    socketio.emit("log_update", upd)
+            # metrics
+            raw = None
             try:
-                if p not in offsets: offsets[p] = p.stat().st_size
-                size = p.stat().st_size
-                if size > offsets[p]:
-                    with p.open("rb") as fh:
-                        fh.seek(offsets[p]); data = fh.read()
-                    offsets[p] = size
-                    socketio.emit("log_update", {"filename": p.name, "content": data.decode(errors="ignore")})
+                with stage("get_stats"):
+                    raw, _prev_net = read_stats(_prev_net)
+                    stats = format_stats(raw)
+                with stage("emit"):
+                    socketio.emit("stats", stats)
             except Exception as e:
-                dbg(f"[ERR] {p}: {e}")
-        # metrics
-        try:
-            stats, _prev_net = get_stats(_prev_net)
-            socketio.emit("stats", stats)
-        except Exception as e:
-            dbg(f"[ERR stats] {e}")
-        # tables (+ tunnel)
-        try:
-            tinfo = read_tunnel_info()
-            tables = {
-                "procs": get_top_processes(),
-                "conns": get_live_connections(),
-                "ports": get_open_ports(),
-                "tunnel": get_tunnel_status(tinfo.get("port", ""))
-            }
-            socketio.emit("tables", tables)
-        except Exception as e:
-            dbg(f"[ERR tables] {e}")
-        eventlet.sleep(POLL_INTERVAL)
+                dbg(f"[ERR stats] {e}")
+            # tables (+ tunnel)
+            try:
+                with stage("processes"):
+                    procs = get_top_processes()
+                with stage("connections"):
+                    conns = get_live_connections()
+                with stage("ports"):
+                    ports = get_open_ports()
+                with stage("tunnel"):
+                    tunnel = get_tunnel_status(read_tunnel_info().get("port", ""))
+                tables = {"procs": procs, "conns": conns, "ports": ports, "tunnel": tunnel}
+                with stage("emit"):
+                    socketio.emit("tables", tables)
+                if raw is not None:
+                    with stage("store"):
+                        record_metrics(raw, tunnel)
+            except Exception as e:
+                dbg(f"[ERR tables] {e}")
+        socketio.sleep(POLL_INTERVAL)
 
 # ─── Networking: local IPv4 for nicer URL ────────────────────────────────────
 def get_local_ip():
@@ -405,6 +499,8 @@ DASH_HTML = r"""
       </div>
       <div class="d-flex align-items-center gap-2">
         <a class="btn btn-sm btn-outline-light" href="https://github.com/izex/ZEX-Tunnel" target="_blank">GitHub</a>
+        <a class="btn btn-sm btn-outline-light" href="{{ url_for('advisor') }}">CPU Advisor</a>
+        <a class="btn btn-sm btn-outline-light" href="{{ url_for('debug_page') }}">Debug</a>
         <a class="btn btn-sm btn-info" href="{{ url_for('logout') }}">Logout</a>
       </div>
     </div>
@@ -658,6 +754,167 @@ function renderTables(t){
 </html>
 """
 
+# ─── HTML: CPU / NIC affinity advisor ───────────────────────────────────────
+ADVISOR_HTML = r"""
+<!doctype html>
+<html lang="en" data-bs-theme="dark">
+<head>
+  <meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1">
+  <title>ZEX Tunnel Web Panel V3 • CPU Advisor</title>
+  <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css" rel="stylesheet">
+  <style>
+    body{background:#0b1220}
+    .card{background:rgba(255,255,255,.04);border-color:rgba(255,255,255,.08)}
+    pre{background:#0a101c;border:1px solid rgba(255,255,255,.08);border-radius:.5rem;padding:.5rem;color:#a7ffb1}
+    .fw-mono{font-family:ui-monospace,SFMono-Regular,Menlo,Consolas,monospace}
+    .table-sm td,.table-sm th{padding:.35rem}
+  </style>
+</head>
+<body>
+  <header class="container py-3">
+    <div class="d-flex justify-content-between align-items-center">
+      <div class="d-flex align-items-center gap-2">
+        <span class="badge text-bg-secondary">ZEX • Panel</span>
+        <h5 class="m-0">CPU / NIC Affinity Advisor</h5>
+      </div>
+      <div class="d-flex align-items-center gap-2">
+        <a class="btn btn-sm btn-outline-light" href="{{ url_for('dashboard') }}">Dashboard</a>
+        <a class="btn btn-sm btn-info" href="{{ url_for('logout') }}">Logout</a>
+      </div>
+    </div>
+  </header>
+
+  <main class="container vstack gap-3 pb-4">
+    <div class="card">
+      <div class="card-body">
+        <h6 class="card-title mb-3">Per-core load <span class="text-secondary small">(over {{ r.interval }}s)</span></h6>
+        <div class="table-responsive">
+          <table class="table table-sm table-hover align-middle">
+            <thead><tr><th>CPU</th><th class="text-end">Busy %</th><th class="text-end">Softirq %</th><th class="text-end">IRQ %</th><th class="text-end">Steal %</th><th>NIC IRQs</th><th class="text-end">Waterwall threads</th></tr></thead>
+            <tbody>
+            {% for c in r.cores %}
+              <tr class="{{ 'table-danger' if c.saturated }}"><td class="fw-mono">{{ c.cpu }}</td><td class="text-end fw-mono">{{ c.busy }}</td><td class="text-end fw-mono">{{ c.softirq }}</td><td class="text-end fw-mono">{{ c.irq }}</td><td class="text-end fw-mono">{{ c.steal }}</td><td class="fw-mono">{{ c.irqs|join(",") or "-" }}</td><td class="text-end fw-mono">{{ c.waterwall_threads }}</td></tr>
+            {% endfor %}
+            </tbody>
+          </table>
+        </div>
+      </div>
+    </div>
+
+    <div class="card">
+      <div class="card-body">
+        <h6 class="card-title mb-3">Interfaces</h6>
+        {% for nic in r.ifaces %}
+          <div class="mb-2"><span class="fw-bold">{{ nic.name }}</span> <span class="text-secondary small">({{ nic.role }}, {{ nic.queues.rx|length }} rx / {{ nic.queues.tx|length }} tx queues)</span></div>
+          <ul class="small fw-mono">
+            {% for q in nic.queues.rx %}<li>{{ q.queue }}: rps_cpus={{ fmt_mask(q.rps_cpus) }} rps_flow_cnt={{ q.rps_flow_cnt }}</li>{% endfor %}
+            {% for q in nic.irqs %}<li>IRQ {{ q.irq }} {{ q.label }}: affinity={{ fmt_list(q.affinity) or "?" }}</li>{% endfor %}
+          </ul>
+        {% else %}
+          <p class="text-secondary small">No uplink / tunnel interface found.</p>
+        {% endfor %}
+        <div class="small text-secondary">Waterwall misc.workers: <span class="text-light fw-mono">{{ r.waterwall.workers if r.waterwall.workers is not none else "N/A" }}</span>
+          {% for p in r.waterwall.processes %} • PID {{ p.pid }} on CPU {{ fmt_list(p.threads|map(attribute="cpu")) }}{% else %} • not running{% endfor %}</div>
+      </div>
+    </div>
+
+    <div class="card">
+      <div class="card-body">
+        <h6 class="card-title mb-3">Recommendation</h6>
+        <p>misc.workers = <span class="fw-mono fw-bold">{{ r.plan.workers }}</span>, workers on CPU <span class="fw-mono">{{ fmt_list(r.plan.worker_cpus) }}</span></p>
+        <ul class="small">{% for n in r.plan.notes %}<li>{{ n }}</li>{% endfor %}</ul>
+        <div class="small text-secondary mb-1">Commands (review before running as root; not persistent across reboot)</div>
+        <pre>{{ r.plan.commands|join("\n") }}</pre>
+      </div>
+    </div>
+  </main>
+</body>
+</html>
+"""
+
+# ─── HTML: Debug (poll-loop timings + profiler) ─────────────────────────────
+DEBUG_HTML = r"""
+<!doctype html>
+<html lang="en" data-bs-theme="dark">
+<head>
+  <meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1">
+  <title>ZEX Tunnel Web Panel V3 • Debug</title>
+  <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css" rel="stylesheet">
+  <style>
+    body{background:#0b1220}
+    .card{background:rgba(255,255,255,.04);border-color:rgba(255,255,255,.08)}
+    .fw-mono{font-family:ui-monospace,SFMono-Regular,Menlo,Consolas,monospace}
+    .table-sm td,.table-sm th{padding:.35rem}
+  </style>
+</head>
+<body>
+  <header class="container py-3">
+    <div class="d-flex justify-content-between align-items-center">
+      <div class="d-flex align-items-center gap-2">
+        <span class="badge text-bg-secondary">ZEX • Panel</span>
+        <h5 class="m-0">Debug</h5>
+      </div>
+      <div class="d-flex align-items-center gap-2">
+        <a class="btn btn-sm btn-outline-light" href="{{ url_for('dashboard') }}">Dashboard</a>
+        <a class="btn btn-sm btn-info" href="{{ url_for('logout') }}">Logout</a>
+      </div>
+    </div>
+  </header>
+
+  <main class="container vstack gap-3 pb-4">
+    <div class="card">
+      <div class="card-body">
+        <h6 class="card-title mb-3">Poll loop stages <span class="text-secondary small">(ms per tick, engine: {{ engine }}, interval {{ poll_interval }}s)</span></h6>
+        <div class="table-responsive">
+          <table class="table table-sm table-hover align-middle">
+            <thead><tr><th>Stage</th><th class="text-end">Ticks</th>
+              <th class="text-end">Wall last</th><th class="text-end">Wall mean</th><th class="text-end">Wall p95</th><th class="text-end">Wall max</th>
+              <th class="text-end">CPU mean</th><th class="text-end">CPU p95</th><th class="text-end">CPU max</th></tr></thead>
+            <tbody id="tbl_stages"><tr><td colspan="9" class="text-secondary">Loading…</td></tr></tbody>
+          </table>
+        </div>
+        <div class="small text-secondary">p95 is a histogram bucket bound. Raw histograms: <a class="link-light" href="{{ url_for('api_debug_timings') }}">/api/debug/timings</a></div>
+      </div>
+    </div>
+
+    <div class="card">
+      <div class="card-body">
+        <h6 class="card-title mb-3">Sampling profiler</h6>
+        <form class="d-flex align-items-end gap-2" method="get" action="{{ url_for('api_debug_profile') }}">
+          <div><label class="form-label small text-secondary" for="sec">Seconds</label>
+            <input id="sec" name="seconds" type="number" min="1" max="{{ max_seconds }}" value="10" class="form-control form-control-sm" style="width:7rem"></div>
+          <div><label class="form-label small text-secondary" for="hz">Samples/s</label>
+            <input id="hz" name="hz" type="number" min="1" max="1000" value="100" class="form-control form-control-sm" style="width:7rem"></div>
+          <button class="btn btn-sm btn-info fw-bold">Capture</button>
+        </form>
+        <div class="small text-secondary mt-2">Downloads folded stacks of the running panel; open them in speedscope.app or flamegraph.pl.</div>
+        {% if engine == "eventlet" %}
+        <div class="small text-warning mt-1">Eventlet engine: each sample only sees the greenlet running at that moment. Greenlets that are switched out never appear, such as the poll loop while it sleeps or parked requests, so most samples show the hub's epoll wait. Use the stage timings above, or the asyncio engine, for per-collector detail.</div>
+        {% endif %}
+      </div>
+    </div>
+  </main>
+
+<script>
+function esc(s){return (s??"").toString().replace(/[&<>"']/g,m=>({"&":"&amp;","<":"&lt;",">":"&gt;","\"":"&quot;","'":"&#39;"}[m]))}
+function f(x){return Number(x).toFixed(2)}
+async function refresh(){
+  try{
+    const r = await fetch("{{ url_for('api_debug_timings') }}"); const d = await r.json();
+    let html = "";
+    for(const [name, s] of Object.entries(d.stages)){
+      const w = s.wall_ms, c = s.cpu_ms;
+      html += `<tr><td class="fw-mono">${esc(name)}</td><td class="text-end fw-mono">${w.count}</td><td class="text-end fw-mono">${f(w.last)}</td><td class="text-end fw-mono">${f(w.mean)}</td><td class="text-end fw-mono">${f(w.p95)}</td><td class="text-end fw-mono">${f(w.max)}</td><td class="text-end fw-mono">${f(c.mean)}</td><td class="text-end fw-mono">${f(c.p95)}</td><td class="text-end fw-mono">${f(c.max)}</td></tr>`;
+    }
+    document.getElementById("tbl_stages").innerHTML = html || `<tr><td colspan="9" class="text-secondary">No ticks yet</td></tr>`;
+  }catch(e){}
+}
+refresh(); setInterval(refresh, 2000);
+</script>
+</body>
+</html>
+"""
+
 # ─── Routes ─────────────────────────────────────────────────────────────────
 @app.route("/", methods=["GET", "POST"])
 def login():
@@ -686,28 +943,82 @@ def dashboard():
         top_n=TOP_N
     )
 
+@app.route("/api/history")
+@login_required
+def api_history():
+    """
+    Stored stats for a time range: ?range=<seconds back> or ?start=&end= (unix),
+    optional &points=<max points> and &port=<tunnel port> for per-port counters.
+    """
+    try:
+        now   = time.time()
+        end   = float(request.args.get("end", now))
+        start = float(request.args.get("start", end - float(request.args.get("range", 3600))))
+        pts   = min(max(int(request.args.get("points", 500)), 1), 5000)
+        port  = request.args.get("port")
+        port  = int(port) if port else None
+        if not (math.isfinite(start) and math.isfinite(end)) or start > end:
+            raise ValueError("range")
+    except (ValueError, OverflowError):
+        return jsonify({"error": "bad query"}), 400
+    return jsonify(store.history(start, end, max_points=pts, port=port))
+
+@app.route("/advisor")
+@login_required
+def advisor():
+    r = affinity.analyze("/", interval=0.5, core_path=BASE_DIR / "core.json")
+    return render_template_string(ADVISOR_HTML, r=r,
+                                  fmt_list=affinity.format_list, fmt_mask=affinity.format_mask)
+
+@app.route("/api/advisor")
+@login_required
+def api_advisor():
+    return jsonify(affinity.analyze("/", interval=0.5, core_path=BASE_DIR / "core.json"))
+
+PROFILE_MAX_SECONDS = 60
+
+@app.route("/debug")
+@login_required
+def debug_page():
+    return render_template_string(DEBUG_HTML, engine=ENGINE, poll_interval=POLL_INTERVAL,
+                                  max_seconds=PROFILE_MAX_SECONDS)
+
+@app.route("/api/debug/timings")
+@login_required
+def api_debug_timings():
+    return jsonify(timings.snapshot())
+
+@app.route("/api/debug/profile")
+@login_required
+def api_debug_profile():
+    """Sample all thread stacks for ?seconds= (default 10) at ?hz= (default 100)."""
+    try:
+        seconds = float(request.args.get("seconds", 10))
+        hz      = int(request.args.get("hz", 100))
+        if not math.isfinite(seconds):
+            raise ValueError("seconds")
+        seconds = min(max(seconds, 0.5), PROFILE_MAX_SECONDS)
+        hz      = min(max(hz, 1), 1000)
+    except (ValueError, OverflowError):
+        return jsonify({"error": "bad query"}), 400
+    folded = profiler.profile(seconds, hz)
+    if folded is None:
+        return jsonify({"error": "a profile is already running"}), 409
+    name = time.strftime("zexweb-%Y%m%d-%H%M%S.folded")
+    return folded, 200, {"Content-Type": "text/plain; charset=utf-8",
+                         "Content-Disposition": f"attachment; filename={name}"}
+
 # ─── Socket gate ────────────────────────────────────────────────────────────
 @socketio.on("connect")
 def ws_gate():
     if not session.get("auth"):
         return False
-    stats, _ = get_stats(psutil.net_io_counters())
-    tinfo = read_tunnel_info()
-    emit("init", {
-        "logs": [{"filename": p.name, "content": tail(p, TAIL_LAST)} for p in ordered_files()],
-        "stats": stats,
-        "tables": {
-            "procs": get_top_processes(),
-            "conns": get_live_connections(),
-            "ports": get_open_ports(),
-            "tunnel": get_tunnel_status(tinfo.get("port",""))
-        }
-    })
+    emit("init", init_payload())
 
 # ─── Runner ─────────────────────────────────────────────────────────────────
 if __name__ == "__main__":
     LOG_DIR.mkdir(exist_ok=True)
-    threading.Thread(target=poll_loop, daemon=True).start()
+    store.start()
 
     def get_local_ip():
         ip = "127.0.0.1"
@@ -729,6 +1040,12 @@ if __name__ == "__main__":
     print(f"🔁  Poll interval : {POLL_INTERVAL} sec")
     print(f"🔑  Login password: {PASSWORD}")
     print(f"🐞  Debug mode    : {DEBUG}")
+    print(f"⚙️   Engine        : {ENGINE}")
     print("=============================================\n")
 
-    socketio.run(app, host="0.0.0.0", port=PORT)
+    if ENGINE == "asyncio":
+        import web_asgi
+        web_asgi.serve(sys.modules[__name__], host="0.0.0.0", port=PORT)
+    else:
+        threading.Thread(target=poll_loop, daemon=True).start()
+        socketio.run(app, host="0.0.0.0", port=PORT)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# ZEX Tunnel Web Panel V3 — asyncio/ASGI engine (uvicorn + python-socketio)
+#
+# Started by `web.py --engine asyncio` (or ZEX_WEB_ENGINE=asyncio). Flask keeps
+# serving the same routes and login flow through a small WSGI bridge; Socket.IO
+# (`init`, `stats`, `tables`, `log_update`) is served natively by AsyncServer.
+# Everything that blocks (Flask views, psutil, /proc and log reads) runs on one
+# shared thread pool.
+
+import asyncio, io, os, sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import socketio, uvicorn
+
+POOL_SIZE = min(16, (os.cpu_count() or 1) + 4)
+
+async def run(fn, *a, **k):
+    return await asyncio.get_running_loop().run_in_executor(None, partial(fn, *a, **k))
+
+# ─── WSGI bridge (Flask routes) ──────────────────────────────────────────────
+class WSGIBridge:
+    """Minimal ASGI -> WSGI adapter; each request runs on the thread pool."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            if scope["type"] == "websocket":
+                await send({"type": "websocket.close", "code": 1000})
+            return
+        body = b""
+        while True:
+            msg = await receive()
+            body += msg.get("body", b"")
+            if not msg.get("more_body"):
+                break
+        status, headers, chunks = await run(self._call, self._environ(scope, body))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b"".join(chunks)})
+
+    @staticmethod
+    def _environ(scope, body):
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        env = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope["query_string"].decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "REMOTE_ADDR": client[0],
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope.get("headers", []):
+            key = name.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            if key not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                key = "HTTP_" + key
+            env[key] = f"{env[key]},{value}" if key in env else value
+        return env
+
+    def _call(self, environ):
+        state = {}
+        def start_response(status, headers, exc_info=None):
+            state["status"] = int(status.split(" ", 1)[0])
+            state["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+        result = self.wsgi_app(environ, start_response)
+        try:
+            chunks = list(result)
+        finally:
+            if hasattr(result, "close"): result.close()
+        return state["status"], state["headers"], chunks
+
+# ─── Auth (Flask session cookie) ─────────────────────────────────────────────
+def session_authed(app, environ) -> bool:
+    """Same check as web.py's ws_gate: the signed Flask session must carry auth."""
+    try:
+        # Flask's own cookie parsing and signature/max-age check; other (non-RFC)
+        # cookies on the same host don't hide the session cookie this way
+        sess = app.session_interface.open_session(app, app.request_class(environ))
+        return bool(sess and sess.get("auth"))
+    except Exception:
+        return False
+
+# ─── Polling loop ────────────────────────────────────────────────────────────
+async def poll_loop(web, sio):
+    """Async twin of web.poll_loop: collectors run concurrently on the pool."""
+    while True:
+        with web.timings.tick() as stage:
+            try:
+                updates = await run(stage.timed, "logs", web.read_log_updates)
+                with stage("emit"):
+                    for upd in updates:
+                        await sio.emit("log_update", upd)
+            except Exception as e:
+                web.dbg(f"[ERR logs] {e}")
+            tunnel, stats, procs, conns, ports = await asyncio.gather(
+                run(stage.timed, "tunnel", lambda: web.get_tunnel_status(web.read_tunnel_info().get("port", ""))),
+                run(stage.timed, "get_stats", web.read_stats, web._prev_net),
+                run(stage.timed, "processes", web.get_top_processes),
+                run(stage.timed, "connections", web.get_live_connections),
+                run(stage.timed, "ports", web.get_open_ports),
+                return_exceptions=True)
+            raw = None
+            if isinstance(stats, Exception):
+                web.dbg(f"[ERR stats] {stats}")
+            else:
+                raw, web._prev_net = stats
+                with stage("emit"):
+                    await sio.emit("stats", web.format_stats(raw))
+            try:
+                for r in (tunnel, procs, conns, ports):
+                    if isinstance(r, Exception): raise r
+                tables = {"procs": procs, "conns": conns, "ports": ports, "tunnel": tunnel}
+                with stage("emit"):
+                    await sio.emit("tables", tables)
+                if raw is not None:
+                    with stage("store"):
+                        web.record_metrics(raw, tunnel)
+            except Exception as e:
+                web.dbg(f"[ERR tables] {e}")
+        await asyncio.sleep(web.POLL_INTERVAL)
+
+# ─── App / Runner ────────────────────────────────────────────────────────────
+def build(web):
+    sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*")
+
+    @sio.event
+    async def connect(sid, environ, auth=None):
+        if not session_authed(web.app, environ):
+            return False
+        # Sent after the handshake completes, like Flask-SocketIO's emit in ws_gate
+        sio.start_background_task(send_init, sid)
+
+    async def send_init(sid):
+        try:
+            await sio.emit("init", await run(web.init_payload), to=sid)
+        except Exception as e:
+            web.dbg(f"[ERR init] {e}")
+
+    return sio, socketio.ASGIApp(sio, other_asgi_app=WSGIBridge(web.app))
+
+async def main(web, host, port):
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="zexweb"))
+    sio, asgi = build(web)
+    poller = asyncio.ensure_future(poll_loop(web, sio))
+    server = uvicorn.Server(uvicorn.Config(asgi, host=host, port=port, lifespan="off",
+                                           access_log=False, log_level="warning"))
+    try:
+        await server.serve()
+    finally:
+        poller.cancel()
+
+def serve(web, host="0.0.0.0", port=8989):
+    asyncio.run(main(web, host, port))
@@ -71,7 +71,7 @@ install_deps() {
   echo "Installing dependencies..."
   apt update -y
   apt install -y python3 python3-pip unzip wget curl jq
-  pip3 install -U flask flask-socketio eventlet psutil
+  pip3 install -U flask flask-socketio eventlet psutil uvicorn
 }
 
 # -------------------- Validation --------------------
@@ -351,7 +351,8 @@ main_loop() {
     printf "  Configuration\n"
     LINE
     printf "   10) Reconfigure Tunnel\n"
-    printf "   11) Edit Web Config\n\n"
+    printf "   11) Edit Web Config\n"
+    printf "   12) CPU / NIC Affinity Advisor\n\n"
 
     printf "  System / Maintenance\n"
     LINE
@@ -393,6 +394,7 @@ main_loop() {
            echo "web.zex not found."
          fi
          read -r -p "Press Enter..." _ ;;
+      12) python3 "$BASE_DIR/affinity.py" | ${PAGER:-less} ;;
       15) continue ;;
       16)
          echo "You are about to uninstall ZEX Tunnel V3 and remove all services/files."